@@ -0,0 +1,266 @@
+import os
+import json
+import argparse
+import datetime
+
+import numpy as np
+import pygame
+
+# 事件与分类编码，写入会话的 meta.json，聚合时据此解码
+EVENT_KINDS = ['hit', 'death', 'powerup_spawn', 'pickup']
+SIDE_NAMES = ['top', 'right', 'bottom', 'left', 'world']
+ENTITY_KINDS = ['obstacle', 'tracker']
+POWERUP_TYPES = ['score', 'shield', 'bomb', 'slow']
+
+FRAME_COLUMNS = [('tick', np.int64), ('x', np.float32), ('y', np.float32), ('dt', np.uint16)]
+EVENT_COLUMNS = [('tick', np.int64), ('kind', np.int8), ('x', np.float32), ('y', np.float32),
+                 ('side', np.int8), ('powerup', np.int8), ('entity', np.int8)]
+
+
+class ColumnChunkWriter:
+    """按列缓存数据行，每满 chunk_size 行写出一个 .npz 分块文件"""
+
+    def __init__(self, directory, prefix, columns, chunk_size=65536):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.columns = {name: np.zeros(chunk_size, dtype=dtype) for name, dtype in columns}
+        self.count = 0
+        self.chunk_index = 0
+
+    def append(self, *values):
+        for column, value in zip(self.columns.values(), values):
+            column[self.count] = value
+        self.count += 1
+        if self.count >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.count == 0:
+            return
+        path = os.path.join(self.directory, f"{self.prefix}_{self.chunk_index:06d}.npz")
+        np.savez(path, **{name: column[:self.count] for name, column in self.columns.items()})
+        self.chunk_index += 1
+        self.count = 0
+
+
+class SessionRecorder:
+    """记录一局游戏的逐帧玩家位置和碰撞/道具事件"""
+
+    def __init__(self, root, world_size, chunk_size=65536):
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.directory = os.path.join(root, f"session_{stamp}")
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(os.path.join(self.directory, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "width": world_size[0],
+                "height": world_size[1],
+                "event_kinds": EVENT_KINDS,
+                "sides": SIDE_NAMES,
+                "entity_kinds": ENTITY_KINDS,
+                "powerup_types": POWERUP_TYPES
+            }, f, ensure_ascii=False, indent=2)
+
+        self.frames = ColumnChunkWriter(self.directory, "frames", FRAME_COLUMNS, chunk_size)
+        self.events = ColumnChunkWriter(self.directory, "events", EVENT_COLUMNS, chunk_size)
+        self.closed = False
+
+    def record_frame(self, tick, x, y, dt=1):
+        self.frames.append(tick, x, y, dt)
+
+    def record_event(self, tick, kind, x, y, side=None, powerup=None, entity=None):
+        side_code = SIDE_NAMES.index(side) if side in SIDE_NAMES else -1
+        powerup_code = POWERUP_TYPES.index(powerup) if powerup in POWERUP_TYPES else -1
+        entity_code = ENTITY_KINDS.index(entity) if entity in ENTITY_KINDS else -1
+        self.events.append(tick, EVENT_KINDS.index(kind), x, y, side_code, powerup_code, entity_code)
+
+    def close(self):
+        if self.closed:
+            return
+        self.frames.flush()
+        self.events.flush()
+        self.closed = True
+
+
+class HeatmapAggregator:
+    """逐个分块流式读取会话数据，增量累积热力图和直方图
+
+    热力图按世界尺寸分组累积，普通模式和竞技场模式的会话不会混在同一张图中。
+    """
+
+    def __init__(self, bins=(80, 60)):
+        self.bins = bins
+        self.heatmaps = {}
+        # 按 (实体类型, 生成方向) 统计碰撞与死亡
+        self.side_counts = {kind: np.zeros((len(ENTITY_KINDS), len(SIDE_NAMES)), dtype=np.int64)
+                            for kind in ('hit', 'death')}
+        self.powerup_counts = {kind: np.zeros(len(POWERUP_TYPES), dtype=np.int64)
+                               for kind in ('powerup_spawn', 'pickup')}
+        self.sessions = 0
+        self.frames = 0
+
+    def _histogram(self, x, y, width, height, weights=None):
+        hist, _, _ = np.histogram2d(x / width, y / height, bins=self.bins,
+                                    range=[[0, 1], [0, 1]], weights=weights)
+        return hist
+
+    def heatmaps_for(self, world_size):
+        if world_size not in self.heatmaps:
+            self.heatmaps[world_size] = {name: np.zeros(self.bins, dtype=np.float64)
+                                         for name in ['position'] + EVENT_KINDS}
+        return self.heatmaps[world_size]
+
+    def add_session(self, directory):
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        width, height = meta["width"], meta["height"]
+        kinds = meta["event_kinds"]
+        # 按名称把会话中的方向编码映射到当前的 SIDE_NAMES
+        side_map = np.array([SIDE_NAMES.index(name) if name in SIDE_NAMES else -1
+                             for name in meta["sides"]], dtype=np.int64)
+        heatmaps = self.heatmaps_for((width, height))
+
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name.startswith("frames_") and name.endswith(".npz"):
+                with np.load(path) as chunk:
+                    dt = chunk['dt']
+                    heatmaps['position'] += self._histogram(chunk['x'], chunk['y'], width, height, dt)
+                    self.frames += int(dt.sum())
+            elif name.startswith("events_") and name.endswith(".npz"):
+                with np.load(path) as chunk:
+                    kind = chunk['kind']
+                    for code, kind_name in enumerate(kinds):
+                        mask = kind == code
+                        if not mask.any():
+                            continue
+                        heatmaps[kind_name] += self._histogram(chunk['x'][mask], chunk['y'][mask],
+                                                               width, height)
+                        if kind_name in self.side_counts:
+                            sides = chunk['side'][mask].astype(np.int64)
+                            if 'entity' in chunk.files:
+                                entities = chunk['entity'][mask].astype(np.int64)
+                            else:
+                                entities = np.zeros_like(sides)
+                            valid = (sides >= 0) & (entities >= 0)
+                            sides = side_map[sides[valid]]
+                            entities = entities[valid]
+                            known = sides >= 0
+                            np.add.at(self.side_counts[kind_name], (entities[known], sides[known]), 1)
+                        if kind_name in self.powerup_counts:
+                            types = chunk['powerup'][mask]
+                            types = types[types >= 0]
+                            self.powerup_counts[kind_name] += np.bincount(types, minlength=len(POWERUP_TYPES))
+
+        self.sessions += 1
+
+    def add_directory(self, root):
+        for directory, _, files in sorted(os.walk(root)):
+            if "meta.json" in files:
+                self.add_session(directory)
+
+    def pickup_rate(self, world_size):
+        """每个格子中已生成道具被拾取的比例，没有生成过道具的格子为 0"""
+        heatmaps = self.heatmaps[world_size]
+        spawned = heatmaps['powerup_spawn']
+        return np.divide(heatmaps['pickup'], spawned,
+                         out=np.zeros_like(spawned), where=spawned > 0)
+
+    def summary(self):
+        return {
+            "sessions": self.sessions,
+            "frames": self.frames,
+            "world_sizes": [f"{width}x{height}" for width, height in self.heatmaps],
+            "deaths_by_side": {entity: dict(zip(SIDE_NAMES, counts))
+                               for entity, counts in zip(ENTITY_KINDS, self.side_counts['death'].tolist())},
+            "hits_by_side": {entity: dict(zip(SIDE_NAMES, counts))
+                             for entity, counts in zip(ENTITY_KINDS, self.side_counts['hit'].tolist())},
+            "powerups_spawned": dict(zip(POWERUP_TYPES, self.powerup_counts['powerup_spawn'].tolist())),
+            "powerups_picked": dict(zip(POWERUP_TYPES, self.powerup_counts['pickup'].tolist()))
+        }
+
+    def render(self, out_dir, scale=8):
+        """将热力图和直方图渲染为 PNG，不需要显示窗口"""
+        os.makedirs(out_dir, exist_ok=True)
+        pygame.font.init()
+
+        # 每种世界尺寸单独输出一组热力图
+        for (width, height), heatmaps in self.heatmaps.items():
+            suffix = f"{width}x{height}"
+            for name, hist in heatmaps.items():
+                save_heatmap(hist, os.path.join(out_dir, f"heatmap_{name}_{suffix}.png"), scale, log=True)
+            save_heatmap(self.pickup_rate((width, height)),
+                         os.path.join(out_dir, f"heatmap_pickup_rate_{suffix}.png"), scale)
+
+        for i, entity in enumerate(ENTITY_KINDS):
+            save_bar_chart(f"deaths by spawn side ({entity})", SIDE_NAMES, self.side_counts['death'][i],
+                           os.path.join(out_dir, f"deaths_by_side_{entity}.png"))
+            save_bar_chart(f"hits by spawn side ({entity})", SIDE_NAMES, self.side_counts['hit'][i],
+                           os.path.join(out_dir, f"hits_by_side_{entity}.png"))
+        save_bar_chart("powerups picked / spawned", POWERUP_TYPES,
+                       self.powerup_counts['pickup'], os.path.join(out_dir, "powerups.png"),
+                       totals=self.powerup_counts['powerup_spawn'])
+
+        with open(os.path.join(out_dir, "summary.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+def heat_colors(values):
+    """把 0~1 的数值映射为黑-红-黄-白的 RGB 数组"""
+    v = np.clip(values, 0, 1)[..., None] * 3 - np.arange(3)
+    return (np.clip(v, 0, 1) * 255).astype(np.uint8)
+
+
+def save_heatmap(hist, path, scale=8, log=False):
+    values = np.log1p(hist) if log else hist
+    peak = values.max()
+    if peak > 0:
+        values = values / peak
+    surface = pygame.surfarray.make_surface(heat_colors(values))
+    surface = pygame.transform.scale(surface, (hist.shape[0] * scale, hist.shape[1] * scale))
+    pygame.image.save(surface, path)
+
+
+def save_bar_chart(title, labels, counts, path, totals=None, size=(480, 300)):
+    width, height = size
+    surface = pygame.Surface(size)
+    surface.fill((10, 10, 20))
+    font = pygame.font.Font(None, 22)
+
+    surface.blit(font.render(title, True, (255, 255, 255)), (10, 10))
+
+    peak = max(int(np.max(totals if totals is not None else counts)), 1)
+    chart_top, chart_bottom = 40, height - 30
+    slot = (width - 20) // len(labels)
+    for i, label in enumerate(labels):
+        x = 10 + i * slot + slot // 4
+        bar_width = slot // 2
+        if totals is not None:
+            total_height = int((chart_bottom - chart_top) * totals[i] / peak)
+            pygame.draw.rect(surface, (60, 60, 100), (x, chart_bottom - total_height, bar_width, total_height))
+        bar_height = int((chart_bottom - chart_top) * counts[i] / peak)
+        pygame.draw.rect(surface, (255, 100, 100), (x, chart_bottom - bar_height, bar_width, bar_height))
+
+        text = f"{counts[i]}" if totals is None else f"{counts[i]}/{totals[i]}"
+        surface.blit(font.render(text, True, (255, 255, 200)), (x, chart_bottom - bar_height - 18))
+        surface.blit(font.render(label, True, (150, 200, 255)), (x, chart_bottom + 6))
+
+    pygame.image.save(surface, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总录制的游戏数据并生成热力图报告")
+    parser.add_argument("sessions", help="录制数据目录（dodger.py --record 的输出）")
+    parser.add_argument("-o", "--output", default="analytics_report", help="报告输出目录")
+    parser.add_argument("--bins", type=int, nargs=2, default=(80, 60), metavar=("X", "Y"))
+    args = parser.parse_args()
+
+    aggregator = HeatmapAggregator(tuple(args.bins))
+    aggregator.add_directory(args.sessions)
+    aggregator.render(args.output)
+    print(json.dumps(aggregator.summary(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
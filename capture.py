@@ -0,0 +1,220 @@
+import os
+import sys
+import zlib
+import queue
+import struct
+import threading
+
+import numpy as np
+import pygame
+
+CAPTURE_FORMATS = ['png', 'y4m', 'raw']
+
+
+def rgb_to_yuv420(rgb, out):
+    """把 (H, W, 3) 的 RGB 帧转换为 YUV420（BT.601 全范围）平面数据，写入 out
+
+    使用 8 位定点整数运算；色度先对 2x2 块求和，再一起右移完成平均。
+    """
+    h, w, _ = rgb.shape
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    y = np.multiply(r, 77, dtype=np.uint16)
+    y += np.multiply(g, 150, dtype=np.uint16)
+    y += np.multiply(b, 29, dtype=np.uint16)
+    y += 128
+    y >>= 8
+    out[:h * w].reshape(h, w)[...] = y
+
+    r4, g4, b4 = (channel[0::2, 0::2].astype(np.int32) + channel[1::2, 0::2] +
+                  channel[0::2, 1::2] + channel[1::2, 1::2] for channel in (r, g, b))
+    u = ((-43 * r4 - 85 * g4 + 128 * b4 + 512) >> 10) + 128
+    v = ((128 * r4 - 107 * g4 - 21 * b4 + 512) >> 10) + 128
+
+    quarter = h * w // 4
+    np.clip(u, 0, 255, out=u)
+    np.clip(v, 0, 255, out=v)
+    out[h * w:h * w + quarter] = u.ravel()
+    out[h * w + quarter:] = v.ravel()
+
+
+def png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(tag)))
+
+
+def write_png(path, scanlines, size, level=1):
+    """写出 8 位 RGB PNG，scanlines 为每行前带一个过滤字节（0）的像素数据
+
+    压缩由 zlib 完成，期间释放 GIL，不会拖慢游戏主循环。
+    """
+    width, height = size
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(png_chunk(b"IHDR", header))
+        f.write(png_chunk(b"IDAT", zlib.compress(scanlines, level)))
+        f.write(png_chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    """后台录制画面：帧像素复制进预分配的缓冲池，由工作线程编码
+
+    缓冲池耗尽时直接丢弃当前帧，游戏循环永远不会等待编码。
+    Y4M/原始流由多个线程并行转换颜色，只按顺序串行写入；
+    被丢弃的帧用上一帧补齐，保证回放时长正确。
+    """
+
+    def __init__(self, out_dir, surface, fmt='png', pool_size=8, workers=2, fps=60, png_level=1):
+        if fmt not in CAPTURE_FORMATS:
+            raise ValueError(f"不支持的录制格式: {fmt}")
+        width, height = surface.get_size()
+        if fmt == 'y4m' and (width % 2 or height % 2):
+            raise ValueError("y4m 录制要求画面宽高为偶数")
+
+        self.out_dir = out_dir
+        self.size = (width, height)
+        self.fmt = fmt
+        self.png_level = png_level
+        os.makedirs(out_dir, exist_ok=True)
+
+        # 32 位画面直接整块复制原始像素，颜色通道的换算交给工作线程
+        self.raw_copy = surface.get_bytesize() == 4
+        if self.raw_copy:
+            shape = (height, surface.get_pitch())
+            shifts = surface.get_shifts()[:3]
+            if sys.byteorder == 'little':
+                self.channels = [shift // 8 for shift in shifts]
+            else:
+                self.channels = [3 - shift // 8 for shift in shifts]
+        else:
+            shape = (height, width, 3)
+
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(np.empty(shape, dtype=np.uint8))
+        self.jobs = queue.Queue()
+
+        self.frame_index = 0
+        self.captured = 0
+        self.dropped = 0
+
+        # 流式格式按入队顺序写入；记录最后一帧用于补齐丢弃的帧
+        self.stream = None
+        self.write_cond = threading.Condition()
+        self.next_seq = 0
+        self.written = 0
+        self.repeated = 0
+        if fmt == 'y4m':
+            self.stream = open(os.path.join(out_dir, "capture.y4m"), 'wb')
+            self.stream.write(f"YUV4MPEG2 W{width} H{height} F{fps}:1 Ip A1:1 C420jpeg\n".encode())
+            self.frame_bytes = 6 + width * height * 3 // 2
+        elif fmt == 'raw':
+            self.stream = open(os.path.join(out_dir, f"capture_{width}x{height}_rgb24.raw"), 'wb')
+            self.frame_bytes = width * height * 3
+        if self.stream:
+            self.last_frame = np.empty(self.frame_bytes, dtype=np.uint8)
+            self.has_last_frame = False
+
+        self.threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def capture(self, surface):
+        """复制一帧画面，成功排队返回 True，缓冲池已满时丢帧返回 False"""
+        index = self.frame_index
+        self.frame_index += 1
+
+        try:
+            buffer = self.pool.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        if self.raw_copy:
+            np.copyto(buffer, np.frombuffer(surface.get_buffer(), dtype=np.uint8).reshape(buffer.shape))
+        else:
+            # surface_to_array 使用 (W, H) 排列，写入转置视图即可得到按行存储的数据
+            pygame.pixelcopy.surface_to_array(buffer.transpose(1, 0, 2), surface)
+        self.jobs.put((index, self.captured, buffer))
+        self.captured += 1
+        return True
+
+    def worker(self):
+        # 每个线程预分配自己的编码缓冲区，编码过程中不再按帧分配大块内存
+        width, height = self.size
+        if self.fmt == 'png':
+            scanlines = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+            rgb = scanlines[:, 1:].reshape(height, width, 3)
+        else:
+            rgb = np.empty((height, width, 3), dtype=np.uint8)
+            frame = np.empty(self.frame_bytes, dtype=np.uint8)
+            if self.fmt == 'y4m':
+                frame[:6] = np.frombuffer(b"FRAME\n", dtype=np.uint8)
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            index, seq, buffer = job
+            try:
+                self.to_rgb(buffer, rgb)
+            finally:
+                self.pool.put(buffer)
+
+            if self.fmt == 'png':
+                try:
+                    write_png(os.path.join(self.out_dir, f"frame_{index:06d}.png"),
+                              scanlines, self.size, self.png_level)
+                except Exception as e:
+                    print(f"录制帧 {index} 失败: {e}")
+                continue
+
+            if self.fmt == 'y4m':
+                rgb_to_yuv420(rgb, frame[6:])
+            else:
+                frame[:] = rgb.reshape(-1)
+            self.write_in_order(index, seq, frame)
+
+    def to_rgb(self, buffer, out):
+        if not self.raw_copy:
+            np.copyto(out, buffer)
+            return
+        width, height = self.size
+        pixels = buffer[:, :width * 4].reshape(height, width, 4)
+        for i, channel in enumerate(self.channels):
+            out[..., i] = pixels[..., channel]
+
+    def write_in_order(self, index, seq, frame):
+        with self.write_cond:
+            while self.next_seq != seq:
+                self.write_cond.wait()
+            try:
+                self.repeat_last_frame(index - self.written)
+                self.stream.write(frame.data)
+                self.last_frame[:] = frame
+                self.has_last_frame = True
+                self.written = index + 1
+            except Exception as e:
+                print(f"录制帧 {index} 失败: {e}")
+            self.next_seq += 1
+            self.write_cond.notify_all()
+
+    def repeat_last_frame(self, count):
+        if not self.has_last_frame:
+            return
+        for _ in range(count):
+            self.stream.write(self.last_frame.data)
+        self.repeated += max(count, 0)
+        self.written += max(count, 0)
+
+    def close(self):
+        """等待已排队的帧编码完成并关闭输出"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.stream:
+            # 录制结束前被丢弃的帧同样补齐
+            self.repeat_last_frame(self.frame_index - self.written)
+            self.stream.close()
+            self.stream = None
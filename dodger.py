@@ -1,9 +1,15 @@
 import pygame
+import numpy as np
 import random
 import math
+import heapq
 import os
 import json
 import datetime
+import argparse
+
+from analytics import SessionRecorder
+from capture import FrameCapture, CAPTURE_FORMATS
 
 # 初始化
 pygame.init()
@@ -11,6 +17,21 @@ WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 clock = pygame.time.Clock()
 
+# 竞技场模式：世界远大于窗口，镜头跟随玩家
+ARENA_WIDTH, ARENA_HEIGHT = 4000, 3000
+ARENA_DRIFTERS = 600
+
+# 竞技场中追踪型障碍物离开视野超过该距离即被回收
+ARENA_CULL_MARGIN = 400
+
+# 远离玩家的实体降低更新频率
+LOD_NEAR_DISTANCE = 1200
+LOD_INTERVAL = 4
+
+# 障碍物的最大尺寸和速度，用于空间索引查询的边距
+OBSTACLE_MAX_SIZE = 30
+OBSTACLE_MAX_SPEED = 4
+
 # 玩家颜色选项
 PLAYER_COLORS = [
     (50, 255, 100),  # 绿色
@@ -86,6 +107,200 @@ class FontManager:
 font_manager = FontManager()
 
 
+def swept_circle_toi(p0, p1, q0, q1, radius):
+    """计算两个在一步内匀速移动的圆首次接触的时间（0~1），不相交返回 None"""
+    # 以 p 为参考系，q 相对 p 的起点与位移
+    rx = q0[0] - p0[0]
+    ry = q0[1] - p0[1]
+    vx = (q1[0] - q0[0]) - (p1[0] - p0[0])
+    vy = (q1[1] - q0[1]) - (p1[1] - p0[1])
+
+    c = rx * rx + ry * ry - radius * radius
+    if c <= 0:
+        return 0.0
+
+    a = vx * vx + vy * vy
+    b = rx * vx + ry * vy
+    if a == 0 or b >= 0:
+        return None
+
+    disc = b * b - a * c
+    if disc < 0:
+        return None
+
+    t = (-b - math.sqrt(disc)) / a
+    if t > 1:
+        return None
+    return t
+
+
+class ParticleSystem:
+    """固定容量的粒子池：环形缓冲区存储，向量化更新，缓存精灵绘制"""
+
+    SIZE_LEVELS = 4
+    # 每个颜色通道量化为 4 级，共 64 种颜色
+    COLOR_LEVELS = 4
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.max_life = np.ones(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.head = 0
+        self._step = np.zeros((capacity, 2), dtype=np.float32)
+
+        # 固定调色板的精灵在创建时一次性预渲染，按 颜色索引 * SIZE_LEVELS + 尺寸级别 存放
+        steps = self.COLOR_LEVELS - 1
+        self.sprites = []
+        for index in range(self.COLOR_LEVELS ** 3):
+            color = tuple(255 * (index // self.COLOR_LEVELS ** channel % self.COLOR_LEVELS) // steps
+                          for channel in (2, 1, 0))
+            for level in range(self.SIZE_LEVELS):
+                radius = level + 1
+                sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+                alpha = 80 + 175 * level // (self.SIZE_LEVELS - 1)
+                pygame.draw.circle(sprite, color + (alpha,), (radius, radius), radius)
+                self.sprites.append((sprite, radius))
+
+    def color_index(self, color):
+        """把任意 RGB 颜色量化到固定调色板中最接近的颜色"""
+        steps = self.COLOR_LEVELS - 1
+        r, g, b = ((channel * steps + 127) // 255 for channel in color[:3])
+        return (r * self.COLOR_LEVELS + g) * self.COLOR_LEVELS + b
+
+    def emit(self, x, y, count, color, speed=4.0, life=40):
+        """在 (x, y) 处发射 count 个粒子，容量不足时覆盖最旧的粒子"""
+        count = min(count, self.capacity)
+        idx = (self.head + np.arange(count)) % self.capacity
+        self.head = (self.head + count) % self.capacity
+
+        angle = np.random.uniform(0, 2 * math.pi, count)
+        magnitude = np.random.uniform(0.2, 1.0, count) * speed
+        self.pos[idx, 0] = x
+        self.pos[idx, 1] = y
+        self.vel[idx, 0] = np.cos(angle) * magnitude
+        self.vel[idx, 1] = np.sin(angle) * magnitude
+        lifetimes = np.random.uniform(0.5, 1.0, count) * life
+        self.life[idx] = lifetimes
+        self.max_life[idx] = lifetimes
+        self.color[idx] = self.color_index(color)
+
+    def update(self, dt=1):
+        # 整个缓冲区一次性更新，已消亡的粒子不会被绘制
+        np.multiply(self.vel, dt, out=self._step)
+        self.pos += self._step
+        self.vel *= 0.94 ** dt
+        self.life -= dt
+
+    def draw(self, screen, offset=(0, 0)):
+        alive = np.flatnonzero(self.life > 0)
+        if alive.size == 0:
+            return
+
+        levels = (self.life[alive] / self.max_life[alive] * self.SIZE_LEVELS).astype(np.int16)
+        np.clip(levels, 0, self.SIZE_LEVELS - 1, out=levels)
+        xs = (self.pos[alive, 0] - offset[0]).astype(np.int32)
+        ys = (self.pos[alive, 1] - offset[1]).astype(np.int32)
+        sprite_ids = self.color[alive].astype(np.int32) * self.SIZE_LEVELS + levels
+
+        sprites = self.sprites
+        blit_list = []
+        for x, y, sprite_id in zip(xs.tolist(), ys.tolist(), sprite_ids.tolist()):
+            sprite, radius = sprites[sprite_id]
+            blit_list.append((sprite, (x - radius, y - radius)))
+        screen.blits(blit_list, False)
+
+
+class EventScheduler:
+    """按帧计时的事件调度器，事件按触发帧存放在最小堆中"""
+
+    def __init__(self):
+        self.tick = 0
+        self.events = []
+        self.counter = 0
+
+    def schedule(self, delay, callback, *args):
+        """在 delay 帧后调用 callback(*args)，返回可用于取消的事件"""
+        event = [self.tick + delay, self.counter, callback, args]
+        self.counter += 1
+        heapq.heappush(self.events, event)
+        return event
+
+    def cancel(self, event):
+        # 延迟删除：只清空回调，出堆时跳过
+        if event is not None:
+            event[2] = None
+
+    def advance(self, dt=1):
+        """推进 dt 帧，按顺序触发期间到期的事件"""
+        target = self.tick + dt
+        while self.events and self.events[0][0] <= target:
+            event = heapq.heappop(self.events)
+            if event[2] is None:
+                continue
+            self.tick = max(self.tick, event[0])
+            event[2](*event[3])
+        self.tick = target
+
+    def ticks_until_next(self):
+        while self.events and self.events[0][2] is None:
+            heapq.heappop(self.events)
+        if not self.events:
+            return None
+        return max(0, self.events[0][0] - self.tick)
+
+    def pending(self):
+        """返回尚未触发的事件 (触发帧, 回调名, 参数) 列表，按时间排序"""
+        return [(event[0], event[2].__name__, event[3])
+                for event in sorted(self.events) if event[2] is not None]
+
+
+class SpatialGrid:
+    """均匀网格空间索引，实体按所在格子分桶，移动时只在跨格时更新"""
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, entity):
+        cell = self.cell_of(entity['pos'][0], entity['pos'][1])
+        entity['cell'] = cell
+        self.cells.setdefault(cell, []).append(entity)
+
+    def remove(self, entity):
+        bucket = self.cells[entity['cell']]
+        bucket.remove(entity)
+        if not bucket:
+            del self.cells[entity['cell']]
+
+    def move(self, entity):
+        cell = self.cell_of(entity['pos'][0], entity['pos'][1])
+        if cell != entity['cell']:
+            self.remove(entity)
+            entity['cell'] = cell
+            self.cells.setdefault(cell, []).append(entity)
+
+    def clear(self):
+        self.cells.clear()
+
+    def query(self, x0, y0, x1, y1):
+        """返回所在格子与矩形区域相交的实体"""
+        cx0, cy0 = self.cell_of(x0, y0)
+        cx1, cy1 = self.cell_of(x1, y1)
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+
 class GameRanking:
     def __init__(self, filename="game_scores.json"):
         self.filename = filename
@@ -138,9 +353,18 @@ class GameRanking:
 
 
 class AIDodger:
-    def __init__(self):
+    def __init__(self, record_dir=None, arena=False):
+        # 世界与镜头（普通模式下世界就是窗口大小，镜头固定在原点）
+        self.arena = arena
+        if arena:
+            self.world_width, self.world_height = ARENA_WIDTH, ARENA_HEIGHT
+        else:
+            self.world_width, self.world_height = WIDTH, HEIGHT
+        self.camera = [0, 0]
+
         # 玩家
-        self.player_pos = [WIDTH // 2, HEIGHT // 2]
+        self.player_pos = [self.world_width // 2, self.world_height // 2]
+        self.player_prev_pos = self.player_pos[:]
         self.player_size = 25
 
         # 玩家颜色
@@ -150,37 +374,59 @@ class AIDodger:
 
         # 障碍物
         self.obstacles = []
-        self.spawn_timer = 0
+        self.obstacle_grid = SpatialGrid()
+        self.drifter_count = 0
         self.spawn_rate = 30
+        self.update_count = 0
 
         # 道具
         self.powerups = []
-        self.powerup_timer = 0
 
         # 游戏状态
         self.score = 0
         self.lives = 3
         self.game_over = False
-        self.slow_time = 0
+        self.slow_active = False
+        self.slow_event = None
+
+        # 事件调度：生成、道具过期、效果结束都作为事件排期
+        self.scheduler = EventScheduler()
+        self.scheduler.schedule(self.spawn_rate, self.on_spawn_event)
+        self.scheduler.schedule(450, self.on_powerup_event)
+
+        # 界面动画计数（每次调用 update 递增）
+        self.ui_tick = 0
 
         # AI追踪器
         self.ai_trackers = []
 
+        # 粒子特效
+        self.particles = ParticleSystem()
+
         # 暂停状态
         self.paused = False
-        self.pause_blink = 0
         self.pause_text_visible = True
 
         # 排名系统
         self.ranking = GameRanking()
         self.show_ranking = False
         self.ranking_scroll = 0
-        self.ranking_animation = 0
 
         # 颜色选择动画
-        self.color_menu_animation = 0
         self.color_selection_pulse = 0
 
+        # 数据记录（用于 analytics.py 生成热力图）
+        self.recorder = SessionRecorder(record_dir, (self.world_width, self.world_height)) if record_dir else None
+
+        self.update_camera()
+        if self.arena:
+            for _ in range(ARENA_DRIFTERS):
+                self.spawn_drifter()
+
+    def close(self):
+        if self.recorder:
+            self.recorder.close()
+
     def toggle_pause(self):
         self.paused = not self.paused
 
@@ -260,126 +506,239 @@ class AIDodger:
         menu_bg.blit(hint3, (width // 2 - hint3.get_width() // 2, instructions_y + 70))
 
         # 绘制动画效果
-        self.color_menu_animation = (self.color_menu_animation + 1) % 60
-        if self.color_menu_animation < 30:
+        if self.ui_tick % 60 < 30:
             pygame.draw.rect(menu_bg, (255, 200, 50, 100), menu_bg.get_rect(), 2)
 
         screen.blit(menu_bg, (x, y))
 
+    def update_camera(self):
+        self.camera[0] = min(max(self.player_pos[0] - WIDTH // 2, 0), self.world_width - WIDTH)
+        self.camera[1] = min(max(self.player_pos[1] - HEIGHT // 2, 0), self.world_height - HEIGHT)
+
+    def add_obstacle(self, obs):
+        obs['lod_far'] = False
+        obs['lod_phase'] = random.randrange(LOD_INTERVAL)
+        obs['lod_dt'] = 0
+        self.obstacles.append(obs)
+        self.obstacle_grid.insert(obs)
+        if obs['type'] == 'drifter':
+            self.drifter_count += 1
+
+    def remove_obstacle(self, obs):
+        self.obstacles.remove(obs)
+        self.obstacle_grid.remove(obs)
+        if obs['type'] == 'drifter':
+            self.drifter_count -= 1
+
     def spawn_obstacle(self):
+        # 在当前视野边缘之外生成
+        cx, cy = self.camera
         side = random.choice(['top', 'right', 'bottom', 'left'])
         if side == 'top':
-            x, y = random.randint(0, WIDTH), -20
+            x, y = cx + random.randint(0, WIDTH), cy - 20
             speed = random.uniform(2, 4)
         elif side == 'right':
-            x, y = WIDTH + 20, random.randint(0, HEIGHT)
+            x, y = cx + WIDTH + 20, cy + random.randint(0, HEIGHT)
             speed = random.uniform(2, 4)
         elif side == 'bottom':
-            x, y = random.randint(0, WIDTH), HEIGHT + 20
+            x, y = cx + random.randint(0, WIDTH), cy + HEIGHT + 20
             speed = random.uniform(2, 4)
         else:
-            x, y = -20, random.randint(0, HEIGHT)
+            x, y = cx - 20, cy + random.randint(0, HEIGHT)
             speed = random.uniform(2, 4)
 
-        self.obstacles.append({
+        self.add_obstacle({
             'pos': [x, y],
-            'size': random.randint(15, 30),
+            'prev_pos': [x, y],
+            'size': random.randint(15, OBSTACLE_MAX_SIZE),
             'speed': speed,
             'color': (random.randint(200, 255), random.randint(50, 100), random.randint(50, 100)),
-            'type': 'normal'
+            'type': 'normal',
+            'side': side
+        })
+
+    def spawn_drifter(self):
+        # 竞技场中的漫游障碍物：在视野外随机位置生成，匀速直线运动并在世界边界反弹
+        while True:
+            x = random.uniform(0, self.world_width)
+            y = random.uniform(0, self.world_height)
+            if not (self.camera[0] - 100 < x < self.camera[0] + WIDTH + 100 and
+                    self.camera[1] - 100 < y < self.camera[1] + HEIGHT + 100):
+                break
+
+        angle = random.uniform(0, 2 * math.pi)
+        speed = random.uniform(1, 3)
+        self.add_obstacle({
+            'pos': [x, y],
+            'prev_pos': [x, y],
+            'size': random.randint(15, OBSTACLE_MAX_SIZE),
+            'speed': speed,
+            'vel': [math.cos(angle) * speed, math.sin(angle) * speed],
+            'color': (random.randint(150, 200), random.randint(50, 100), random.randint(200, 255)),
+            'type': 'drifter',
+            'side': 'world'
         })
 
     def spawn_ai_tracker(self):
+        cx, cy = self.camera
         side = random.choice(['top', 'right', 'bottom', 'left'])
         if side == 'top':
-            x, y = random.randint(0, WIDTH), -20
+            x, y = cx + random.randint(0, WIDTH), cy - 20
         elif side == 'right':
-            x, y = WIDTH + 20, random.randint(0, HEIGHT)
+            x, y = cx + WIDTH + 20, cy + random.randint(0, HEIGHT)
         elif side == 'bottom':
-            x, y = random.randint(0, WIDTH), HEIGHT + 20
+            x, y = cx + random.randint(0, WIDTH), cy + HEIGHT + 20
         else:
-            x, y = -20, random.randint(0, HEIGHT)
+            x, y = cx - 20, cy + random.randint(0, HEIGHT)
 
         self.ai_trackers.append({
             'pos': [x, y],
+            'prev_pos': [x, y],
             'size': 20,
             'speed': random.uniform(1.5, 2.5),
             'color': (255, 100, 100),
-            'track_strength': random.uniform(0.3, 0.7)
+            'track_strength': random.uniform(0.3, 0.7),
+            'side': side
         })
 
     def spawn_powerup(self):
         types = ['score', 'shield', 'bomb', 'slow']
         type_choice = random.choice(types)
-        self.powerups.append({
-            'pos': [random.randint(50, WIDTH - 50), random.randint(50, HEIGHT - 50)],
+        powerup = {
+            'pos': [self.camera[0] + random.randint(50, WIDTH - 50),
+                    self.camera[1] + random.randint(50, HEIGHT - 50)],
             'size': 15,
             'type': type_choice,
             'color': (0, 200, 255) if type_choice == 'score' else
             (255, 200, 0) if type_choice == 'shield' else
             (255, 100, 255) if type_choice == 'bomb' else
-            (100, 255, 255),
-            'timer': 300
-        })
+            (100, 255, 255)
+        }
+        powerup['expire_event'] = self.scheduler.schedule(300, self.expire_powerup, powerup)
+        self.powerups.append(powerup)
+
+        if self.recorder:
+            self.recorder.record_event(self.scheduler.tick, 'powerup_spawn',
+                                       powerup['pos'][0], powerup['pos'][1], powerup=type_choice)
+
+    def on_spawn_event(self):
+        self.spawn_obstacle()
+
+        if self.score % 500 == 0 and len(self.ai_trackers) < 5:
+            self.spawn_ai_tracker()
+
+        if self.arena and self.drifter_count < ARENA_DRIFTERS:
+            self.spawn_drifter()
+
+        self.scheduler.schedule(self.spawn_rate, self.on_spawn_event)
+
+    def on_powerup_event(self):
+        self.spawn_powerup()
+        self.scheduler.schedule(450, self.on_powerup_event)
+
+    def expire_powerup(self, powerup):
+        if powerup in self.powerups:
+            self.powerups.remove(powerup)
+
+    def end_slow(self):
+        self.slow_active = False
+        self.slow_event = None
+
+    def run_headless(self, frames, max_dt=8):
+        """无界面快速推进 frames 帧，每步直接跳到下一个事件（最多 max_dt 帧）"""
+        remaining = frames
+        while remaining > 0 and not self.game_over:
+            dt = self.scheduler.ticks_until_next()
+            if dt is None or dt > max_dt:
+                dt = max_dt
+            dt = max(1, min(dt, remaining))
+            self.update(dt)
+            remaining -= dt
+
+    def update(self, dt=1):
+        # dt 为本次更新推进的帧数，碰撞使用连续检测，较大的步长也不会穿透
+        self.ui_tick += 1
 
-    def update(self):
         if self.game_over:
             return
 
         if self.paused:
-            self.pause_blink = (self.pause_blink + 1) % 60
-            self.pause_text_visible = self.pause_blink < 30
+            self.pause_text_visible = self.ui_tick % 60 < 30
             return
 
         if self.show_color_menu:
             self.color_selection_pulse += 1
             return
 
-        # 玩家跟随鼠标
+        # 记录本步起点，用于连续碰撞检测（障碍物在实际移动时记录）
+        self.player_prev_pos = self.player_pos[:]
+        for tracker in self.ai_trackers:
+            tracker['prev_pos'] = tracker['pos'][:]
+
+        # 玩家跟随鼠标（鼠标位置换算到世界坐标）
         mouse_pos = pygame.mouse.get_pos()
-        dx = mouse_pos[0] - self.player_pos[0]
-        dy = mouse_pos[1] - self.player_pos[1]
+        dx = mouse_pos[0] + self.camera[0] - self.player_pos[0]
+        dy = mouse_pos[1] + self.camera[1] - self.player_pos[1]
         distance = math.sqrt(dx * dx + dy * dy)
         if distance > 0:
-            move_speed = min(8, distance / 5)
+            move_speed = min(8 * dt, distance / 5 * dt, distance)
             self.player_pos[0] += dx / distance * move_speed
             self.player_pos[1] += dy / distance * move_speed
 
-        # 生成障碍物
-        self.spawn_timer += 1
-        if self.spawn_timer >= self.spawn_rate:
-            self.spawn_obstacle()
-            self.spawn_timer = 0
+        if self.arena:
+            self.player_pos[0] = min(max(self.player_pos[0], self.player_size),
+                                     self.world_width - self.player_size)
+            self.player_pos[1] = min(max(self.player_pos[1], self.player_size),
+                                     self.world_height - self.player_size)
+        self.update_camera()
 
-            if self.score % 500 == 0 and len(self.ai_trackers) < 5:
-                self.spawn_ai_tracker()
+        # 触发到期事件（生成障碍物、道具及过期、效果结束）
+        self.scheduler.advance(dt)
 
-        # 生成道具
-        self.powerup_timer += 1
-        if self.powerup_timer >= 450:
-            self.spawn_powerup()
-            self.powerup_timer = 0
-
-        # 更新障碍物
+        # 更新障碍物：远离玩家的障碍物每 LOD_INTERVAL 次才更新一次，累积的帧数一并推进
+        self.update_count += 1
         for obs in self.obstacles[:]:
+            if obs['lod_far'] and (self.update_count + obs['lod_phase']) % LOD_INTERVAL:
+                obs['lod_dt'] += dt
+                continue
+            step = obs['lod_dt'] + dt
+            obs['lod_dt'] = 0
+            obs['prev_pos'] = obs['pos'][:]
+
             dx = self.player_pos[0] - obs['pos'][0]
             dy = self.player_pos[1] - obs['pos'][1]
             dist = max(math.sqrt(dx * dx + dy * dy), 0.1)
+            obs['lod_far'] = dist > LOD_NEAR_DISTANCE
 
             speed_mod = 1.0
             if dist < 100:
                 speed_mod = 0.7
 
-            if self.slow_time > 0:
+            if self.slow_active:
                 speed_mod *= 0.5
 
-            obs['pos'][0] += dx / dist * obs['speed'] * speed_mod
-            obs['pos'][1] += dy / dist * obs['speed'] * speed_mod
+            if obs['type'] == 'drifter':
+                self.move_drifter(obs, speed_mod * step)
+                self.obstacle_grid.move(obs)
+                continue
 
-            if (obs['pos'][0] < -100 or obs['pos'][0] > WIDTH + 100 or
-                    obs['pos'][1] < -100 or obs['pos'][1] > HEIGHT + 100):
-                self.obstacles.remove(obs)
+            obs['pos'][0] += dx / dist * obs['speed'] * speed_mod * step
+            obs['pos'][1] += dy / dist * obs['speed'] * speed_mod * step
+
+            # 普通模式按屏幕边界回收；竞技场按视野加边距回收，避免被甩开的障碍物无限累积
+            if self.arena:
+                min_x, min_y = self.camera[0] - ARENA_CULL_MARGIN, self.camera[1] - ARENA_CULL_MARGIN
+                max_x, max_y = self.camera[0] + WIDTH + ARENA_CULL_MARGIN, self.camera[1] + HEIGHT + ARENA_CULL_MARGIN
+            else:
+                min_x, min_y = -100, -100
+                max_x, max_y = WIDTH + 100, HEIGHT + 100
+
+            if (obs['pos'][0] < min_x or obs['pos'][0] > max_x or
+                    obs['pos'][1] < min_y or obs['pos'][1] > max_y):
+                self.remove_obstacle(obs)
                 self.score += 5
+            else:
+                self.obstacle_grid.move(obs)
 
         # 更新AI追踪器
         for tracker in self.ai_trackers[:]:
@@ -387,65 +746,112 @@ class AIDodger:
             dy = self.player_pos[1] - tracker['pos'][1]
             dist = max(math.sqrt(dx * dx + dy * dy), 0.1)
 
-            tracker['pos'][0] += dx / dist * tracker['speed'] * tracker['track_strength']
-            tracker['pos'][1] += dy / dist * tracker['speed'] * tracker['track_strength']
+            tracker['pos'][0] += dx / dist * tracker['speed'] * tracker['track_strength'] * dt
+            tracker['pos'][1] += dy / dist * tracker['speed'] * tracker['track_strength'] * dt
 
-            tracker['pos'][0] += random.uniform(-1, 1)
-            tracker['pos'][1] += random.uniform(-1, 1)
+            jitter = math.sqrt(dt)
+            tracker['pos'][0] += random.uniform(-1, 1) * jitter
+            tracker['pos'][1] += random.uniform(-1, 1) * jitter
 
-        # 更新道具
-        for powerup in self.powerups[:]:
-            powerup['timer'] -= 1
-            if powerup['timer'] <= 0:
-                self.powerups.remove(powerup)
+        # 更新粒子特效
+        self.particles.update(dt)
 
         # 检测碰撞
-        self.check_collisions()
+        self.check_collisions(dt)
 
         # 更新分数
-        self.score += 1
+        self.score += dt
 
-        # 更新减速效果
-        if self.slow_time > 0:
-            self.slow_time -= 1
+        if self.recorder:
+            self.recorder.record_frame(self.scheduler.tick, self.player_pos[0], self.player_pos[1], dt)
 
         # 调整生成速度
         self.spawn_rate = max(15, 30 - self.score // 500)
 
-    def check_collisions(self):
-        player_rect = pygame.Rect(self.player_pos[0] - self.player_size,
-                                  self.player_pos[1] - self.player_size,
-                                  self.player_size * 2, self.player_size * 2)
+    def move_drifter(self, obs, frames):
+        pos, vel = obs['pos'], obs['vel']
+        pos[0] += vel[0] * frames
+        pos[1] += vel[1] * frames
+
+        if pos[0] < 0:
+            pos[0], vel[0] = -pos[0], abs(vel[0])
+        elif pos[0] > self.world_width:
+            pos[0], vel[0] = 2 * self.world_width - pos[0], -abs(vel[0])
+        if pos[1] < 0:
+            pos[1], vel[1] = -pos[1], abs(vel[1])
+        elif pos[1] > self.world_height:
+            pos[1], vel[1] = 2 * self.world_height - pos[1], -abs(vel[1])
+
+    def check_collisions(self, dt=1):
+        # 对本步内的运动轨迹做连续检测，并按碰撞时刻先后依次结算
+        p0 = self.player_prev_pos
+        p1 = self.player_pos
+        hits = []
+
+        # 只检查空间索引中玩家扫过区域附近的障碍物
+        margin = self.player_size + OBSTACLE_MAX_SIZE + OBSTACLE_MAX_SPEED * dt
+        nearby = self.obstacle_grid.query(min(p0[0], p1[0]) - margin, min(p0[1], p1[1]) - margin,
+                                          max(p0[0], p1[0]) + margin, max(p0[1], p1[1]) + margin)
+
+        for obs in nearby:
+            t = swept_circle_toi(p0, p1, obs.get('prev_pos', obs['pos']), obs['pos'],
+                                 self.player_size + obs['size'])
+            if t is not None:
+                hits.append((t, 'obstacle', obs))
 
-        for obs in self.obstacles[:]:
-            obs_rect = pygame.Rect(obs['pos'][0] - obs['size'],
-                                   obs['pos'][1] - obs['size'],
-                                   obs['size'] * 2, obs['size'] * 2)
-            if player_rect.colliderect(obs_rect):
-                self.lives -= 1
-                self.obstacles.remove(obs)
-                if self.lives <= 0:
-                    self.game_over = True
-                    self.ranking.add_score(self.score, self.lives)
+        for tracker in self.ai_trackers:
+            t = swept_circle_toi(p0, p1, tracker.get('prev_pos', tracker['pos']), tracker['pos'],
+                                 self.player_size + tracker['size'])
+            if t is not None:
+                hits.append((t, 'tracker', tracker))
 
-        for tracker in self.ai_trackers[:]:
-            tracker_rect = pygame.Rect(tracker['pos'][0] - tracker['size'],
-                                       tracker['pos'][1] - tracker['size'],
-                                       tracker['size'] * 2, tracker['size'] * 2)
-            if player_rect.colliderect(tracker_rect):
+        for powerup in self.powerups:
+            t = swept_circle_toi(p0, p1, powerup['pos'], powerup['pos'],
+                                 self.player_size + powerup['size'])
+            if t is not None:
+                hits.append((t, 'powerup', powerup))
+
+        hits.sort(key=lambda hit: hit[0])
+
+        for t, kind, obj in hits:
+            # 碰撞时刻玩家所在位置
+            hit_x = p0[0] + (p1[0] - p0[0]) * t
+            hit_y = p0[1] + (p1[1] - p0[1]) * t
+
+            if kind == 'obstacle':
+                # 炸弹可能已在更早的时刻清除了该障碍物
+                if obj not in self.obstacles:
+                    continue
+                self.lives -= 1
+                self.remove_obstacle(obj)
+                self.particles.emit(obj['pos'][0], obj['pos'][1], 60, obj['color'], 5.0, 40)
+            elif kind == 'tracker':
                 self.lives -= 2
-                self.ai_trackers.remove(tracker)
-                if self.lives <= 0:
-                    self.game_over = True
-                    self.ranking.add_score(self.score, self.lives)
-
-        for powerup in self.powerups[:]:
-            powerup_rect = pygame.Rect(powerup['pos'][0] - powerup['size'],
-                                       powerup['pos'][1] - powerup['size'],
-                                       powerup['size'] * 2, powerup['size'] * 2)
-            if player_rect.colliderect(powerup_rect):
-                self.apply_powerup(powerup['type'])
-                self.powerups.remove(powerup)
+                self.ai_trackers.remove(obj)
+                self.particles.emit(obj['pos'][0], obj['pos'][1], 120, obj['color'], 6.0, 50)
+            else:
+                self.apply_powerup(obj['type'])
+                self.powerups.remove(obj)
+                self.scheduler.cancel(obj['expire_event'])
+                self.particles.emit(obj['pos'][0], obj['pos'][1], 40, obj['color'], 3.0, 30)
+                if self.recorder:
+                    # 记录道具所在位置，与 powerup_spawn 事件对齐
+                    self.recorder.record_event(self.scheduler.tick, 'pickup', obj['pos'][0], obj['pos'][1],
+                                               powerup=obj['type'])
+                continue
+
+            if self.recorder:
+                self.recorder.record_event(self.scheduler.tick, 'hit', hit_x, hit_y,
+                                           side=obj['side'], entity=kind)
+
+            if self.lives <= 0:
+                self.game_over = True
+                self.ranking.add_score(self.score, self.lives)
+                if self.recorder:
+                    self.recorder.record_event(self.scheduler.tick, 'death', hit_x, hit_y,
+                                               side=obj['side'], entity=kind)
+                    self.recorder.close()
+                break
 
     def apply_powerup(self, powerup_type):
         if powerup_type == 'score':
@@ -453,10 +859,19 @@ class AIDodger:
         elif powerup_type == 'shield':
             self.lives = min(5, self.lives + 1)
         elif powerup_type == 'bomb':
-            self.obstacles.clear()
+            # 清除视野（含屏幕外 100 像素）内的障碍物
+            x0, y0 = self.camera[0] - 100, self.camera[1] - 100
+            x1, y1 = self.camera[0] + WIDTH + 100, self.camera[1] + HEIGHT + 100
+            for obs in self.obstacle_grid.query(x0, y0, x1, y1):
+                if x0 <= obs['pos'][0] <= x1 and y0 <= obs['pos'][1] <= y1:
+                    self.particles.emit(obs['pos'][0], obs['pos'][1], 30, obs['color'], 4.0, 45)
+                    self.remove_obstacle(obs)
+            self.particles.emit(self.player_pos[0], self.player_pos[1], 200, (255, 100, 255), 9.0, 40)
             self.score += 100
         elif powerup_type == 'slow':
-            self.slow_time = 300
+            self.scheduler.cancel(self.slow_event)
+            self.slow_active = True
+            self.slow_event = self.scheduler.schedule(300, self.end_slow)
 
     def draw_ranking(self, screen, x, y, width, height):
         font_normal = font_manager.get_font(28)
@@ -531,8 +946,7 @@ class AIDodger:
         hint = font_small.render("按 T 键关闭排名", True, (100, 255, 100))
         ranking_bg.blit(hint, (width // 2 - hint.get_width() // 2, height - 20))
 
-        self.ranking_animation = (self.ranking_animation + 1) % 60
-        if self.ranking_animation < 30:
+        if self.ui_tick % 60 < 30:
             pygame.draw.rect(ranking_bg, (255, 215, 0, 150), ranking_bg.get_rect(), 2)
 
         screen.blit(ranking_bg, (x, y))
@@ -546,10 +960,17 @@ class AIDodger:
             size = random.randint(1, 3)
             pygame.draw.circle(screen, (100, 100, 150), (x, y), size)
 
+        # 世界坐标减去镜头偏移即为屏幕坐标
+        ox, oy = self.camera
+        player_x = int(self.player_pos[0] - ox)
+        player_y = int(self.player_pos[1] - oy)
+
+        if self.arena:
+            pygame.draw.rect(screen, (80, 80, 140),
+                             (int(-ox), int(-oy), self.world_width, self.world_height), 3)
+
         # 绘制玩家（使用选择的颜色）
-        pygame.draw.circle(screen, self.player_color,
-                           (int(self.player_pos[0]), int(self.player_pos[1])),
-                           self.player_size)
+        pygame.draw.circle(screen, self.player_color, (player_x, player_y), self.player_size)
 
         # 玩家中心点
         center_color = (
@@ -557,50 +978,52 @@ class AIDodger:
             min(255, self.player_color[1] + 100),
             min(255, self.player_color[2] + 100)
         )
-        pygame.draw.circle(screen, center_color,
-                           (int(self.player_pos[0]), int(self.player_pos[1])),
-                           self.player_size // 3)
-
-        if self.slow_time > 0:
-            pygame.draw.circle(screen, (100, 100, 255),
-                               (int(self.player_pos[0]), int(self.player_pos[1])),
-                               self.player_size + 10, 3)
-
-        for obs in self.obstacles:
-            pygame.draw.circle(screen, obs['color'],
-                               (int(obs['pos'][0]), int(obs['pos'][1])),
-                               obs['size'])
-            pygame.draw.circle(screen, (255, 255, 255),
-                               (int(obs['pos'][0]), int(obs['pos'][1])),
-                               obs['size'], 2)
+        pygame.draw.circle(screen, center_color, (player_x, player_y), self.player_size // 3)
+
+        if self.slow_active:
+            pygame.draw.circle(screen, (100, 100, 255), (player_x, player_y), self.player_size + 10, 3)
+
+        # 通过空间索引只取视野附近的障碍物
+        margin = OBSTACLE_MAX_SIZE
+        for obs in self.obstacle_grid.query(ox - margin, oy - margin,
+                                            ox + WIDTH + margin, oy + HEIGHT + margin):
+            x = int(obs['pos'][0] - ox)
+            y = int(obs['pos'][1] - oy)
+            if not (-obs['size'] < x < WIDTH + obs['size'] and -obs['size'] < y < HEIGHT + obs['size']):
+                continue
+            pygame.draw.circle(screen, obs['color'], (x, y), obs['size'])
+            pygame.draw.circle(screen, (255, 255, 255), (x, y), obs['size'], 2)
 
         for tracker in self.ai_trackers:
-            pygame.draw.circle(screen, tracker['color'],
-                               (int(tracker['pos'][0]), int(tracker['pos'][1])),
-                               tracker['size'])
-            pygame.draw.circle(screen, (255, 50, 50),
-                               (int(tracker['pos'][0]), int(tracker['pos'][1])),
-                               tracker['size'] // 2)
-            pygame.draw.circle(screen, (255, 255, 255),
-                               (int(tracker['pos'][0]), int(tracker['pos'][1])),
-                               tracker['size'] // 3)
+            x = int(tracker['pos'][0] - ox)
+            y = int(tracker['pos'][1] - oy)
+            if not (-tracker['size'] < x < WIDTH + tracker['size'] and
+                    -tracker['size'] < y < HEIGHT + tracker['size']):
+                continue
+            pygame.draw.circle(screen, tracker['color'], (x, y), tracker['size'])
+            pygame.draw.circle(screen, (255, 50, 50), (x, y), tracker['size'] // 2)
+            pygame.draw.circle(screen, (255, 255, 255), (x, y), tracker['size'] // 3)
 
         for powerup in self.powerups:
-            color = powerup['color']
-            pos = powerup['pos']
             size = powerup['size']
+            x = int(powerup['pos'][0] - ox)
+            y = int(powerup['pos'][1] - oy)
+            if not (-size < x < WIDTH + size and -size < y < HEIGHT + size):
+                continue
 
             if powerup['type'] == 'score':
-                pygame.draw.circle(screen, (255, 215, 0), (int(pos[0]), int(pos[1])), size)
-                pygame.draw.circle(screen, (255, 255, 0), (int(pos[0]), int(pos[1])), size - 3)
+                pygame.draw.circle(screen, (255, 215, 0), (x, y), size)
+                pygame.draw.circle(screen, (255, 255, 0), (x, y), size - 3)
             elif powerup['type'] == 'shield':
-                pygame.draw.circle(screen, (0, 200, 255), (int(pos[0]), int(pos[1])), size)
-                pygame.draw.circle(screen, (200, 230, 255), (int(pos[0]), int(pos[1])), size - 5)
+                pygame.draw.circle(screen, (0, 200, 255), (x, y), size)
+                pygame.draw.circle(screen, (200, 230, 255), (x, y), size - 5)
             elif powerup['type'] == 'bomb':
-                pygame.draw.circle(screen, (255, 100, 100), (int(pos[0]), int(pos[1])), size)
-                pygame.draw.circle(screen, (255, 150, 150), (int(pos[0]), int(pos[1])), size - 3)
+                pygame.draw.circle(screen, (255, 100, 100), (x, y), size)
+                pygame.draw.circle(screen, (255, 150, 150), (x, y), size - 3)
             else:
-                pygame.draw.circle(screen, (100, 100, 255), (int(pos[0]), int(pos[1])), size)
+                pygame.draw.circle(screen, (100, 100, 255), (x, y), size)
+
+        self.particles.draw(screen, self.camera)
 
         font_normal = font_manager.get_font(36)
         font_small = font_manager.get_font(24)
@@ -716,7 +1139,17 @@ class AIDodger:
 
 
 def main():
-    game = AIDodger()
+    parser = argparse.ArgumentParser(description="AI Dodger")
+    parser.add_argument("--arena", action="store_true", help="竞技场模式：更大的世界，镜头跟随玩家")
+    parser.add_argument("--record", metavar="DIR", help="记录玩家位置和碰撞事件到指定目录")
+    parser.add_argument("--capture", metavar="DIR", help="后台录制游戏画面到指定目录")
+    parser.add_argument("--capture-format", choices=CAPTURE_FORMATS, default='png',
+                        help="录制格式：PNG 序列、Y4M 视频流或原始 RGB 流")
+    args = parser.parse_args()
+
+    capture = FrameCapture(args.capture, screen, args.capture_format) if args.capture else None
+
+    game = AIDodger(args.record, args.arena)
     running = True
 
     while running:
@@ -733,7 +1166,8 @@ def main():
                         running = False
                 elif event.key == pygame.K_r:
                     if game.game_over or game.paused:
-                        game = AIDodger()
+                        game.close()
+                        game = AIDodger(args.record, args.arena)
                 elif event.key == pygame.K_p:
                     if not game.show_ranking and not game.show_color_menu:
                         game.toggle_pause()
@@ -770,8 +1204,14 @@ def main():
         game.update()
         game.draw(screen)
         pygame.display.flip()
+        if capture:
+            capture.capture(screen)
         clock.tick(60)
 
+    game.close()
+    if capture:
+        capture.close()
+        print(f"录制完成: {capture.captured} 帧, 丢弃 {capture.dropped} 帧")
     pygame.quit()
 
 